@@ -1,12 +1,24 @@
 #!/usr/bin/env python3
 import os
-import json
+import gzip
+import hashlib
 import time
+import threading
+import orjson
 import requests
 import tkinter as tk
-from urllib.parse import urlencode, urlparse, urlunparse, parse_qs
-
-VERSION = open("VERSION", "r").read().strip()
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urlencode
+
+try:
+    with open("VERSION", "r", encoding="utf-8") as _vf:
+        VERSION = _vf.read().strip()
+except FileNotFoundError:
+    VERSION = "dev"
 
 ###############################################################################
 # Configuration File
@@ -14,6 +26,11 @@ VERSION = open("VERSION", "r").read().strip()
 
 CONFIG_FILE = "waypointdb_findmy_config.json"
 PENDING_DATA_FILE = "pending_data.json"  # NEW: for storing unsent location data
+SEND_WORKERS = 8  # concurrent sends; also the number of kept-alive connections per server
+GZIP_MIN_SIZE = 1024  # bytes; smaller request bodies are sent uncompressed
+MAX_PENDING_PER_KEY = 5000  # unsent points kept per queue; the oldest are dropped first
+PENDING_TTL_SECONDS = 7 * 86400  # unsent points older than this are dropped
+MAX_SEND_BACKOFF = 3600  # seconds; upper bound of the retry delay for a failing endpoint
 
 def load_config():
     """
@@ -22,8 +39,8 @@ def load_config():
     """
     if os.path.isfile(CONFIG_FILE):
         try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
+            with open(CONFIG_FILE, "rb") as f:
+                return orjson.loads(f.read())
         except Exception as e:
             print(f"Error reading {CONFIG_FILE}: {e}")
 
@@ -33,44 +50,132 @@ def load_config():
     }
 
 def save_config(conf):
-    """Save config dict to JSON file."""
+    """Save config dict to JSON file (without the cached "_..." keys of the rows)."""
+    conf = dict(conf)
+    conf["tag_configs"] = [
+        {k: v for k, v in row.items() if not k.startswith("_")}
+        for row in conf.get("tag_configs", [])
+    ]
     try:
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(conf, f, indent=2)
+        with open(CONFIG_FILE, "wb") as f:
+            f.write(orjson.dumps(conf, option=orjson.OPT_INDENT_2))
         print(f"Configuration saved to {CONFIG_FILE}")
     except Exception as e:
         print(f"Error saving {CONFIG_FILE}: {e}")
 
+def compile_row(row):
+    """
+    Build the batch endpoint URL (with ?api_key=...) for a tag config row once,
+    and cache it on the row as row["_final_url"]. Returns the URL.
+
+    Also caches row["_endpoint"] = "server_url::<short api_key hash>", which
+    names the endpoint in pending_data keys without writing the key to disk.
+    """
+    server_url = row.get("server_url", "")
+    # add path /api/v1/gps/batch to the server_url
+    if not server_url.endswith("/"):
+        server_url += "/"
+    api_key = row.get("api_key", "")
+    # Append ?api_key=... (the base URL has no query of its own, it precedes the path)
+    final_url = server_url + "api/v1/gps/batch?" + urlencode({"api_key": api_key})
+
+    row["_endpoint"] = server_url + "::" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+    row["_final_url"] = final_url
+    return final_url
+
 ###############################################################################
 # Data Models
 ###############################################################################
 
+@dataclass(slots=True)
 class ItemLocation:
-    def __init__(self, latitude=0.0, longitude=0.0, timeStamp=0.0,
-                 horizontalAccuracy=0.0, verticalAccuracy=0.0, altitude=0.0):
-        self.latitude = latitude
-        self.longitude = longitude
-        self.timeStamp = timeStamp
-        self.horizontalAccuracy = horizontalAccuracy
-        self.verticalAccuracy = verticalAccuracy
-        self.altitude = altitude
-
+    latitude: float = 0.0
+    longitude: float = 0.0
+    timeStamp: float = 0.0
+    horizontalAccuracy: float = 0.0
+    verticalAccuracy: float = 0.0
+    altitude: float = 0.0
+
+@dataclass(slots=True)
 class FindMyItem:
-    def __init__(self, name="", serialNumber="", batteryStatus=None, location=None):
-        self.name = name
-        self.serialNumber = serialNumber
-        self.batteryStatus = batteryStatus
-        self.location = location  # ItemLocation
+    name: str = ""
+    serialNumber: str = ""
+    batteryStatus: object = None
+    location: ItemLocation = None
+    # (timeStamp, latitude, longitude), or None without location; compared between polls
+    location_key: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        loc = self.location
+        self.location_key = (loc.timeStamp, loc.latitude, loc.longitude) if loc else None
+
+def looks_truncated(raw):
+    """
+    Cheap check that raw was cut off while the FindMy daemon rewrites
+    Items.data: it is empty, or starts with "[" but does not end with "]".
+    Anything else (e.g. the binary Items.data of unsupported macOS versions)
+    is left to the parser and its error path.
+    """
+    head = raw[:16].lstrip()
+    if not head:
+        return not raw.strip()  # rare: only strip the whole buffer if it starts blank
+    return head[:1] == b"[" and raw[-16:].rstrip()[-1:] != b"]"
+
+def parse_items_data(raw):
+    """
+    Decode the raw Items.data bytes straight into FindMyItem objects.
+    The decoded item dicts are only temporaries and are freed on return.
+    Returns None without parsing if raw is an obviously truncated array.
+    """
+    if looks_truncated(raw):
+        return None
+    # Bind the hot names to locals once, so the loop body avoids global lookups
+    _ItemLocation = ItemLocation
+    _FindMyItem = FindMyItem
+    new_items = []
+    items_append = new_items.append
+    for d in orjson.loads(raw):  # Expect a list of item dicts
+        loc_data = d.get("location")  # missing or null for items without a known location
+        if loc_data:
+            get = loc_data.get
+            # positional: latitude, longitude, timeStamp, horizontalAccuracy, verticalAccuracy, altitude
+            loc = _ItemLocation(
+                get("latitude", 0.0),
+                get("longitude", 0.0),
+                get("timeStamp", 0.0) / 1000,
+                get("horizontalAccuracy", 0.0),
+                get("verticalAccuracy", 0.0),
+                get("altitude", 0.0)
+            )
+        else:
+            loc = None
+        items_append(_FindMyItem(d.get("name", ""), d.get("serialNumber", ""), d.get("batteryStatus"), loc))
+    return new_items
 
 ###############################################################################
 # Core Logic: Reading Items.data, Sending to Server(s), and Storing Unsent Data
 ###############################################################################
 
+def encode_payload(payload, compress=True):
+    """
+    Serialize a request payload with orjson, gzipping bodies over GZIP_MIN_SIZE
+    unless compress is False. Returns (body, headers).
+    """
+    body = orjson.dumps(payload)
+    headers = {"Content-Type": "application/json"}
+    if compress and len(body) > GZIP_MIN_SIZE:
+        # Large bodies are reconnection backlogs; favour size on slow uplinks
+        body = gzip.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
 class ItemsDataMonitor:
     """
     Periodically reads `Items.data`, detects changes, sends updates for any
     tag config row that matches the item serial. If an item has multiple rows,
-    multiple HTTP requests are made (one per row).
+    a point is queued per row; each poll then sends one HTTP request per
+    distinct (server_url, api_key), carrying the points of all its items.
 
     # NEW OR MODIFIED:
     - We store unsent data in memory and on disk (in PENDING_DATA_FILE).
@@ -81,172 +186,318 @@ class ItemsDataMonitor:
     def __init__(self, config):
         # config is a dict: { "tag_configs": [ {...}, {...} ] }
         self.config = config
-        self.poll_interval = 60  # seconds
-        self.polling = False
-
-        self.last_items = []  # store old items to detect location changes
+        # Adaptive poll interval (seconds): backs off while idle, snaps back on changes
+        self.min_interval = 15
+        self.max_interval = 600
+        self.current_interval = self.min_interval
+        self.stop_event = threading.Event()  # set to end the polling thread; also stops UI callbacks
+        self.poll_thread = None
+        self.root = None  # Tk root, used to hand results from send workers back to the UI thread
+
+        self.last_items_by_serial = {}  # serialNumber -> FindMyItem, old items to detect location changes
+        self.items_data_path = os.path.join(
+            os.path.expanduser("~"),
+            "Library", "Caches",
+            "com.apple.findmy.fmipcore",
+            "Items.data"
+        )
+        self.last_items_stat = None  # (st_mtime_ns, st_size) of the last parsed Items.data
+        self.incomplete_items_stat = None  # same, of the last Items.data skipped as incomplete
+        self.check_lock = threading.Lock()  # a poll and a forced refresh may run at once
         # For displaying last-sent times in the UI
         self.last_sent_timestamps = {}  # serialNumber -> float (time.time())
+        self.time_str_cache = {}  # (serialNumber, int(last_t)) -> formatted last update time
 
         # UI references
         self.items_listbox = None  # the Listbox that shows discovered items
         self.item_list = []        # local mirror of items so we know what's in each index
+        self.listbox_entries = []  # texts currently shown in the listbox, to update only what changed
 
         # NEW: Load pending data from disk so we can retry sending it
-        self.pending_data = self.load_pending_data()  # dict: key=(serial::serverUrl), val=[gps_data, ...]
+        self.pending_data = self.load_pending_data()  # dict: key=(serial::serverUrl::apiKeyHash), val=[gps_data, ...]
+        self.pending_lock = threading.Lock()  # guards pending_data, which the send workers share
+        self.pending_dirty = False  # pending_data changed since it was last saved
+
+        # One pooled session for all sends, so connections to the server(s) are kept alive
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=SEND_WORKERS,
+            max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Sends run on worker threads so the Tk mainloop never waits on the network
+        self.pool = ThreadPoolExecutor(max_workers=SEND_WORKERS)
+        self.send_backoff = {}  # final_url -> (next_attempt_ts, fail_count) of failing endpoints
+        # Endpoints with a request in flight, and pending keys deferred until it is done
+        # (both guarded by pending_lock, so no point is sent twice concurrently)
+        self.sending_urls = set()
+        self.no_gzip_urls = set()  # endpoints that rejected a gzipped body; sent uncompressed
+        self.deferred_batches = {}  # final_url -> (server_url, [pending_key, ...])
+
+        self.configs_by_serial = {}  # serial -> [tag config row, ...]
+        self.reindex_configs()
+
+    def reindex_configs(self):
+        """
+        Rebuild configs_by_serial from config["tag_configs"].
+        Must be called whenever the tag config rows change.
+        """
+        configs_by_serial = defaultdict(list)
+        for row in self.config.get("tag_configs", []):
+            compile_row(row)
+            configs_by_serial[row.get("serial")].append(row)
+        self.configs_by_serial = dict(configs_by_serial)
+        self.rehome_pending_queues()
+
+    def rehome_pending_queues(self):
+        """
+        Move queues whose endpoint is no longer configured for their serial
+        (e.g. after the api_key was corrected) to the serial's current row for
+        the same server_url, so their points are sent with the new key.
+        Also covers the older "serial::server_url" keys without a key hash.
+        Empty queues of unconfigured endpoints are dropped.
+        """
+        with self.pending_lock:
+            for key in list(self.pending_data):
+                serial_num, _, endpoint = key.partition("::")
+                rows = self.configs_by_serial.get(serial_num, ())
+                if any(row["_endpoint"] == endpoint for row in rows):
+                    continue
+                if not self.pending_data[key]:
+                    del self.pending_data[key]
+                    self.pending_dirty = True
+                    continue
+                # "server_url::hash", or the older "server_url/" and "server_url/api/v1/gps/batch?api_key=..."
+                if "api/v1/gps/batch?" in endpoint:
+                    server_url = endpoint.partition("api/v1/gps/batch?")[0]
+                elif endpoint.endswith("/"):
+                    server_url = endpoint
+                else:
+                    server_url = endpoint.rpartition("::")[0]
+                for row in rows:
+                    if row["_endpoint"].rpartition("::")[0] == server_url:
+                        new_key = f"{serial_num}::{row['_endpoint']}"
+                        self.pending_data[new_key].extend(self.pending_data.pop(key))
+                        self.pending_dirty = True
+                        break
 
     def load_pending_data(self):
-        """Load pending data (unsent location points) from JSON file."""
+        """
+        Load pending data (unsent location points) from JSON file.
+        Returns a defaultdict(list), so a new key needs no setup before appending.
+        """
         if not os.path.isfile(PENDING_DATA_FILE):
-            return {}
+            return defaultdict(list)
         try:
-            with open(PENDING_DATA_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            with open(PENDING_DATA_FILE, "rb") as f:
+                data = orjson.loads(f.read())
             # Should be a dict of key -> list
             if isinstance(data, dict):
-                return data
+                return defaultdict(list, data)
             else:
-                return {}
+                return defaultdict(list)
         except Exception as e:
             print(f"Error reading {PENDING_DATA_FILE}: {e}")
-            return {}
+            return defaultdict(list)
 
     def save_pending_data(self):
-        """Save the self.pending_data dictionary to disk."""
+        """
+        Save the self.pending_data dictionary to disk.
+        Written and fsynced to a temporary file first, then renamed over the
+        old one, so a crash leaves either the old or the new file intact.
+        """
+        tmp_file = PENDING_DATA_FILE + ".tmp"
         try:
-            with open(PENDING_DATA_FILE, "w", encoding="utf-8") as f:
-                json.dump(self.pending_data, f, indent=2)
+            with open(tmp_file, "wb") as f:
+                f.write(orjson.dumps(self.pending_data, option=orjson.OPT_INDENT_2))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, PENDING_DATA_FILE)
         except Exception as e:
             print(f"Error saving {PENDING_DATA_FILE}: {e}")
 
+    def save_pending_data_if_dirty(self):
+        """Save pending_data once if it changed since the last save."""
+        with self.pending_lock:
+            if self.pending_dirty:
+                self.save_pending_data()
+                self.pending_dirty = False
+
     def start_polling(self, root):
-        self.polling = True
-        self.poll(root)
+        self.root = root
+        self.stop_event.clear()
+        # Stop UI callbacks before the window goes away (close button and Cmd-Q on macOS)
+        root.protocol("WM_DELETE_WINDOW", self.close_window)
+        root.createcommand("::tk::mac::Quit", self.close_window)
+        self.poll_thread = threading.Thread(target=self.poll_loop, daemon=True)
+        self.poll_thread.start()
+
+    def close_window(self):
+        """
+        Set stop_event so workers stop scheduling Tk calls, then destroy the
+        window once the calls they already queued have been processed.
+        Otherwise a worker can block forever in root.after() after mainloop exits.
+        """
+        self.stop_event.set()
+        self.root.after_idle(self.root.destroy)
 
     def stop_polling(self):
-        self.polling = False
-
-    def poll(self, root):
-        if not self.polling:
-            return
-        self.check_items_data(force_send=False)
-        root.after(self.poll_interval * 1000, lambda: self.poll(root))
+        # After mainloop has returned: no more Tk calls from the threads joined below
+        self.stop_event.set()
+        if self.poll_thread:
+            self.poll_thread.join()
+        # Let in-flight sends finish (queued ones keep their points pending), so the
+        # save below does not keep points that were already sent
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.session.close()
+        self.save_pending_data_if_dirty()
+
+    def poll_loop(self):
+        """Polling thread: poll, then sleep the adaptive interval until stopped."""
+        while True:
+            changed = self.check_items_data(force_send=False)
+            if changed:
+                self.current_interval = self.min_interval
+            else:
+                self.current_interval = min(self.max_interval, self.current_interval * 1.5)
+            if self.stop_event.wait(self.current_interval):
+                return
 
     def force_refresh(self):
-        self.check_items_data(force_send=True)
+        threading.Thread(target=self.check_items_data, args=(True,), daemon=True).start()
 
     def check_items_data(self, force_send=False):
         """
         Reads Items.data, decodes JSON, detects location changes, and sends updates.
+        Does nothing if the file is unchanged since the last poll (unless force_send).
+        Returns True if any item's location changed.
+
+        Runs off the Tk thread; the listbox refresh is handed back via run_on_ui_thread.
         """
-        file_path = os.path.join(
-            os.path.expanduser("~"),
-            "Library", "Caches",
-            "com.apple.findmy.fmipcore",
-            "Items.data"
-        )
+        with self.check_lock:
+            result = self.read_and_diff(force_send)
+            if result is not None:
+                new_items, batches, changed = result
+                # One request per (server_url, final_url), carrying every queued point
+                self.flush_batches(batches, force=force_send)
+            # Persist new points, and queues emptied by earlier sends, once per poll
+            self.save_pending_data_if_dirty()
+        if result is None:
+            return False
+        self.run_on_ui_thread(self.update_items_listbox, new_items)
+        return changed
+
+    def read_and_diff(self, force_send=False):
+        """
+        Read and decode Items.data and queue points for changed items.
+        Returns (new_items, batches, changed), or None if there is nothing to do.
+        """
+        file_path = self.items_data_path
 
         try:
+            st = os.stat(file_path)
+            items_stat = (st.st_mtime_ns, st.st_size)
+            if items_stat == self.last_items_stat and not force_send:
+                return None
+            # Plain read(), not mmap: the FindMy daemon may truncate the file while
+            # we read it, which would crash a mapped read with SIGBUS; a short
+            # buffer is caught by the truncation check instead
             with open(file_path, "rb") as f:
                 raw = f.read()
-            data = json.loads(raw)  # Expect a list of item dicts
+            new_items = parse_items_data(raw)
         except Exception as e:
             print(f"Error reading {file_path}: {e}")
-
-            # show error popup
-            error_window = tk.Toplevel()
-            error_window.title("Error")
-            error_label = tk.Label(error_window, text=f"Error reading {file_path}: {e}\nCheck compatible macOS version.")
-            error_label.pack(padx=10, pady=10)
-            ok_button = tk.Button(error_window, text="OK", command=error_window.destroy)
-            ok_button.pack(pady=(0, 10))
-            
-            return
-
-        new_items = []
-        for d in data:
-            name = d.get("name", "")
-            serial = d.get("serialNumber", "")
-            battery = d.get("batteryStatus", None)
-            loc_data = d.get("location", {})
-
-            loc = ItemLocation(
-                latitude=loc_data.get("latitude", 0.0),
-                longitude=loc_data.get("longitude", 0.0),
-                timeStamp=loc_data.get("timeStamp", 0.0) / 1000,
-                horizontalAccuracy=loc_data.get("horizontalAccuracy", 0.0),
-                verticalAccuracy=loc_data.get("verticalAccuracy", 0.0),
-                altitude=loc_data.get("altitude", 0.0)
-            )
-            item = FindMyItem(name, serial, battery, loc)
-            new_items.append(item)
-
-        # Check changes and send
+            self.run_on_ui_thread(self.show_error, f"Error reading {file_path}: {e}\nCheck compatible macOS version.")
+            return None
+
+        if new_items is None:
+            # Mid-write; the next poll sees a new mtime/size and retries
+            if items_stat != self.incomplete_items_stat:
+                print(f"{file_path} looks incomplete, skipping this poll.")
+                self.incomplete_items_stat = items_stat
+            return None
+
+        # Check changes and queue
+        batches = {}  # (server_url, final_url) -> [pending_key, ...]
+        changed = False
         for item in new_items:
-            if self.location_has_changed(item) or force_send:
-                # Send one request per config row that has matching serial
-                self.send_item_location_to_all_configs(item)
+            item_changed = self.location_has_changed(item)
+            changed = changed or item_changed
+            if item_changed or force_send:
+                # Queue one point per config row that has matching serial
+                self.send_item_location_to_all_configs(item, batches)
+        self.add_waiting_queues(batches)
 
-        self.last_items = new_items
-        self.update_items_listbox(new_items)
+        self.last_items_stat = items_stat
+        self.last_items_by_serial = {itm.serialNumber: itm for itm in new_items}
+        return new_items, batches, changed
 
     def location_has_changed(self, new_item):
         """
         Returns True if new_item's location differs from the old item with the same serial.
         """
-        old_item = next((x for x in self.last_items if x.serialNumber == new_item.serialNumber), None)
+        old_item = self.last_items_by_serial.get(new_item.serialNumber)
         if not old_item:
             return True  # brand new
-        if not old_item.location or not new_item.location:
-            return False
-        return (
-            old_item.location.timeStamp != new_item.location.timeStamp or
-            old_item.location.latitude != new_item.location.latitude or
-            old_item.location.longitude != new_item.location.longitude
-        )
+        # Losing the location is not a change; gaining the first one is
+        return new_item.location_key is not None and old_item.location_key != new_item.location_key
 
-    def send_item_location_to_all_configs(self, item):
+    def send_item_location_to_all_configs(self, item, batches):
         """
-        Sends the location update to *every* config entry that has matching `serial`.
-        i.e., you can have multiple rows for the same serial -> multiple requests.
+        Queues the location update for *every* config entry that has matching `serial`.
+        i.e., you can have multiple rows for the same serial -> multiple queued points.
+
+        The pending keys are grouped in `batches` by (server_url, final_url), so
+        flush_batches() can send every item for one endpoint in a single request.
         """
         item_serial = item.serialNumber
-        matching_rows = [row for row in self.config.get("tag_configs", []) if row.get("serial") == item_serial]
+        matching_rows = self.configs_by_serial.get(item_serial, ())
 
         if not matching_rows:
             # No config row for this item
             return
 
+        queued_urls = set()  # duplicate rows (same server_url and api_key) queue the point once
         for row in matching_rows:
-            self.send_item_location(item, row)
+            if row.get("_final_url") in queued_urls:
+                continue
+            queued = self.send_item_location(item, row)
+            if queued:
+                server_url, final_url, pending_key = queued
+                queued_urls.add(final_url)
+                keys = batches.setdefault((server_url, final_url), [])
+                if pending_key not in keys:
+                    keys.append(pending_key)
 
     def send_item_location(self, item, row):
         """
-        Sends location with row['server_url'] and row['api_key'].
+        Queues location for row['server_url'] and row['api_key'].
+        Returns (server_url, final_url, pending_key), or None if nothing was queued.
 
         # NEW OR MODIFIED:
-        - We add the new location data to pending_data, then attempt to send
-          all pending data (including the new one). If it fails, the data stays.
-          If it succeeds, we clear it out.
+        - We add the new location data to pending_data; flush_batches() then
+          attempts to send all pending data (including the new one). If it
+          fails, the data stays. If it succeeds, we clear it out.
         """
         loc = item.location
         if not loc:
             print(f"No location for {item.serialNumber}, skipping send.")
-            return
+            return None
         server_url = row.get("server_url", "")
-        api_key = row.get("api_key", "")
         if not server_url:
             print(f"No server_url for item {item.serialNumber} in row {row}, skipping.")
-            return
+            return None
         
-        # add path /api/v1/gps/batch to the server_url
         if not server_url.endswith("/"):
             server_url += "/"
-        server_url_with_path = server_url + "api/v1/gps/batch"
         # Check if server_url is valid
-        if not server_url_with_path.startswith("http://") and not server_url_with_path.startswith("https://"):
-            print(f"Invalid server_url for item {item.serialNumber}: {server_url_with_path}")
-            return
+        if not server_url.startswith("http://") and not server_url.startswith("https://"):
+            print(f"Invalid server_url for item {item.serialNumber}: {server_url}")
+            return None
+        final_url = row.get("_final_url") or compile_row(row)
 
         # Build the new data point
         new_data_point = {
@@ -262,68 +513,182 @@ class ItemsDataMonitor:
             "speed_accuracy": 0
         }
 
-        # 1) Add to pending_data for this serial + serverUrl
-        pending_key = f"{item.serialNumber}::{server_url}"
-        if pending_key not in self.pending_data:
-            self.pending_data[pending_key] = []
-        self.pending_data[pending_key].append(new_data_point)
-        self.save_pending_data()
-
-        # 2) Attempt to flush all pending data in one request
-        self.attempt_send_pending(pending_key, api_key)
-
-    def attempt_send_pending(self, pending_key, api_key):
+        # Add to pending_data for this serial + endpoint (server_url and api_key)
+        pending_key = f"{item.serialNumber}::{row['_endpoint']}"
+        with self.pending_lock:
+            queue = self.pending_data[pending_key]
+            queue.append(new_data_point)
+            # Bound the queue while the server stays unreachable (oldest points first);
+            # the new point is always kept, even if the tag's location is old
+            cutoff = time.time() - PENDING_TTL_SECONDS
+            if float(queue[0]["timestamp"]) < cutoff:
+                queue[:] = [point for point in queue[:-1] if float(point["timestamp"]) >= cutoff]
+                queue.append(new_data_point)
+            if len(queue) > MAX_PENDING_PER_KEY:
+                del queue[:len(queue) - MAX_PENDING_PER_KEY]
+            self.pending_dirty = True
+
+        return server_url, final_url, pending_key
+
+    def add_waiting_queues(self, batches):
+        """
+        Add queues of other serials that still hold unsent points (from failed
+        sends) to a batch already going to the same endpoint (server_url and
+        api_key), so they ride along instead of waiting for their own tag to move.
         """
-        Attempt to send *all* pending data for a particular (serial+serverUrl).
+        if not batches:
+            return
+        # All keys of one batch share its endpoint
+        keys_by_endpoint = {keys[0].partition("::")[2]: keys for keys in batches.values()}
+        with self.pending_lock:
+            waiting = [key for key, points in self.pending_data.items() if points]
+        for pending_key in waiting:
+            serial_num, _, endpoint = pending_key.partition("::")
+            keys = keys_by_endpoint.get(endpoint)
+            if keys is None or pending_key in keys:
+                continue
+            # Only while the serial is still configured for that endpoint
+            if any(row["_endpoint"] == endpoint for row in self.configs_by_serial.get(serial_num, ())):
+                keys.append(pending_key)
+
+    def flush_batches(self, batches, force=False):
+        """
+        Submit one send per (server_url, final_url) group to the worker pool.
+        With force (an explicit user refresh), failing endpoints are retried
+        right away instead of waiting out their backoff.
+        """
+        for (server_url, final_url), pending_keys in batches.items():
+            if force:
+                with self.pending_lock:
+                    self.send_backoff.pop(final_url, None)
+            future = self.pool.submit(self.attempt_send_batch, server_url, final_url, pending_keys)
+            future.add_done_callback(self.report_send_error)
+
+    def report_send_error(self, future):
+        """Print an exception raised by a send worker; the executor would swallow it."""
+        if not future.cancelled() and future.exception():
+            print(f"Error in send worker: {future.exception()}")
+
+    def attempt_send_batch(self, server_url, final_url, pending_keys):
+        """
+        Attempt to send *all* pending data of several (serial+endpoint) queues
+        that share server_url and api_key, as one request. Runs on a worker thread.
         If it succeeds, remove them from pending_data; if fails, keep them.
+        A failing endpoint is retried with exponential backoff; until then its
+        points just stay queued. While a request to the endpoint is in flight,
+        the batch is deferred and sent right after it.
         """
+        with self.pending_lock:
+            next_attempt_ts, _ = self.send_backoff.get(final_url, (0, 0))
+            if time.time() < next_attempt_ts:
+                return
+            if final_url in self.sending_urls:
+                deferred_keys = self.deferred_batches.setdefault(final_url, (server_url, []))[1]
+                deferred_keys.extend(key for key in pending_keys if key not in deferred_keys)
+                return
+            self.sending_urls.add(final_url)
+            # Snapshot the queues; points appended while the request is in flight stay queued
+            batch = {key: list(self.pending_data.get(key, [])) for key in pending_keys}
+
+        try:
+            self.send_batch(server_url, final_url, batch)
+        finally:
+            with self.pending_lock:
+                self.sending_urls.discard(final_url)
+                deferred = self.deferred_batches.pop(final_url, None)
+        if deferred:
+            self.attempt_send_batch(deferred[0], final_url, deferred[1])
+
+    def send_batch(self, server_url, final_url, batch):
+        """
+        POST the snapshot `batch` (pending_key -> points) to final_url and update
+        pending_data and the endpoint's backoff. Called by attempt_send_batch.
+        """
+        all_data_points = [point for points in batch.values() for point in points]
+
         # If there's nothing queued, skip
-        if pending_key not in self.pending_data or not self.pending_data[pending_key]:
+        if not all_data_points:
             return
 
-        # Parse out serverUrl from pending_key
-        # pending_key =  "serialNumber::serverUrl"
-        # We only want the serverUrl portion after the "::"
-        parts = pending_key.split("::", 1)
-        if len(parts) != 2:
-            return
-        serial_num = parts[0]
-        base_url = parts[1]
-        # Construct final URL
-        if not base_url.endswith("/"):
-            base_url += "/"
-        final_url = base_url + "api/v1/gps/batch"
-
-        # Append ?api_key=... to the final_url
-        parsed = urlparse(final_url)
-        qdict = parse_qs(parsed.query)
-        qdict["api_key"] = [api_key]
-        new_query = urlencode(qdict, doseq=True)
-        final_url = urlunparse(parsed._replace(query=new_query))
+        # pending_key = "serialNumber::serverUrl::apiKeyHash"
+        serials = [key.split("::", 1)[0] for key, points in batch.items() if points]
 
         # Prepare full payload from all pending data
-        all_data_points = self.pending_data[pending_key]
         payload = {
             "gps_data": all_data_points
         }
 
+        body, headers = encode_payload(payload, compress=final_url not in self.no_gzip_urls)
+
         try:
-            r = requests.post(final_url, json=payload, timeout=10)
+            r = self.session.post(final_url, data=body, headers=headers, timeout=(3.05, 10))
+            if r.status_code in (400, 415) and "Content-Encoding" in headers:
+                # Many server stacks do not decompress request bodies; retry plain, and remember
+                print(f"HTTP {r.status_code} for gzipped body to {server_url}, sending uncompressed from now on.")
+                self.no_gzip_urls.add(final_url)
+                body, headers = encode_payload(payload, compress=False)
+                r = self.session.post(final_url, data=body, headers=headers, timeout=(3.05, 10))
             if str(r.status_code).startswith("2"):
-                print(f"Location sent for serial={serial_num} to {base_url} OK.")
-                self.last_sent_timestamps[serial_num] = time.time()
-                # Clear the queue on success
-                self.pending_data[pending_key] = []
-                self.save_pending_data()
-            else:
-                print(f"HTTP {r.status_code} for serial={serial_num} to {base_url}: {r.text}")
+                print(f"Location sent for serials={serials} to {server_url} OK.")
+                # Clear exactly the sent points from the queues on success
+                with self.pending_lock:
+                    for key, points in batch.items():
+                        sent = {id(point) for point in points}
+                        queue = self.pending_data.get(key, [])
+                        queue[:] = [point for point in queue if id(point) not in sent]
+                    self.pending_dirty = True
+                    self.send_backoff.pop(final_url, None)
+                self.run_on_ui_thread(self.mark_sent, serials)
+                return
+            print(f"HTTP {r.status_code} for serials={serials} to {server_url}: {r.text}")
         except Exception as e:
-            print(f"Error sending location for {serial_num} to {base_url}: {e}")
+            print(f"Error sending location for {serials} to {server_url}: {e}")
+
+        with self.pending_lock:
+            _, fail_count = self.send_backoff.get(final_url, (0, 0))
+            fail_count += 1
+            delay = min(60 * 2 ** fail_count, MAX_SEND_BACKOFF)
+            self.send_backoff[final_url] = (time.time() + delay, fail_count)
+        print(f"Retrying {server_url} in {delay}s at the earliest.")
 
     ###########################################################################
     # UI Logic for the "Tracked Items" Listbox
     ###########################################################################
 
+    def run_on_ui_thread(self, func, *args):
+        """
+        Schedule func(*args) on the Tk thread; Tk must not be touched from workers.
+        Dropped once stopping, since the mainloop may no longer service the call.
+        """
+        if self.stop_event.is_set():
+            return
+        if self.root is None:
+            func(*args)
+            return
+        try:
+            self.root.after(0, func, *args)
+        except (RuntimeError, tk.TclError):
+            pass  # mainloop exited or window destroyed in the meantime
+
+    def show_error(self, message):
+        """Show an error popup (Tk thread)."""
+        error_window = tk.Toplevel()
+        error_window.title("Error")
+        error_label = tk.Label(error_window, text=message)
+        error_label.pack(padx=10, pady=10)
+        ok_button = tk.Button(error_window, text="OK", command=error_window.destroy)
+        ok_button.pack(pady=(0, 10))
+
+    def mark_sent(self, serials):
+        """Record a successful send for serials and refresh the listbox (Tk thread)."""
+        now = time.time()
+        for serial_num in serials:
+            last_t = self.last_sent_timestamps.get(serial_num)
+            if last_t:
+                self.time_str_cache.pop((serial_num, int(last_t)), None)
+            self.last_sent_timestamps[serial_num] = now
+        self.update_items_listbox(self.item_list)
+
     def set_items_listbox(self, lb):
         """
         Assign the Tkinter Listbox that displays discovered items.
@@ -333,14 +698,28 @@ class ItemsDataMonitor:
         self.items_listbox.bind("<Double-Button-1>", self.on_item_double_click)
 
     def update_items_listbox(self, new_items):
-        """Refresh the listbox with new_items. Show name, serial, last update time."""
+        """
+        Refresh the listbox with new_items. Show name, serial, last update time.
+        Only rows whose text changed are touched.
+        """
         self.item_list = new_items[:]  # keep a local copy
         if not self.items_listbox:
             return
-        self.items_listbox.delete(0, tk.END)
-        for itm in new_items:
-            txt = self.format_item_listbox_entry(itm)
-            self.items_listbox.insert(tk.END, txt)
+        lb = self.items_listbox
+        new_entries = [self.format_item_listbox_entry(itm) for itm in new_items]
+        old_entries = self.listbox_entries
+        if new_entries == old_entries:
+            return  # nothing changed, no Tk calls at all
+        for i, txt in enumerate(new_entries[:len(old_entries)]):
+            if txt != old_entries[i]:
+                lb.delete(i)
+                lb.insert(i, txt)
+        # Append new tails, delete surplus
+        for txt in new_entries[len(old_entries):]:
+            lb.insert(tk.END, txt)
+        if len(old_entries) > len(new_entries):
+            lb.delete(len(new_entries), tk.END)
+        self.listbox_entries = new_entries
 
     def format_item_listbox_entry(self, item):
         """
@@ -348,7 +727,11 @@ class ItemsDataMonitor:
         """
         last_t = self.last_sent_timestamps.get(item.serialNumber)
         if last_t:
-            t_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last_t))
+            cache_key = (item.serialNumber, int(last_t))
+            t_str = self.time_str_cache.get(cache_key)
+            if t_str is None:
+                t_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last_t))
+                self.time_str_cache[cache_key] = t_str
             return f"{item.name} ({item.serialNumber}) - Last Update: {t_str}"
         else:
             return f"{item.name} ({item.serialNumber}) - Last Update: None"
@@ -374,8 +757,9 @@ class ItemsDataMonitor:
             "api_key": ""
         }
         self.config["tag_configs"].append(entry)
-        # Rebuild the tag config table
-        build_tag_table(tag_table_frame, self.config, self)
+        self.reindex_configs()
+        # Append just the new row to the tag config table
+        build_tag_row(tag_table_frame, entry, self.config, self)
         # (We won't auto-save to avoid confusion; user can "Save & Refresh" later.)
 
 ###############################################################################
@@ -411,7 +795,10 @@ def build_main_ui(root, config, monitor):
     def save_and_refresh():
         # Collect from table
         collect_tag_table_into_config(tag_table_frame, config)
+        monitor.reindex_configs()
         save_config(config)
+        # Rows now refer to the freshly collected dicts (and show current names)
+        build_tag_table(tag_table_frame, config, monitor)
         monitor.force_refresh()
 
     btn_save = tk.Button(bottom_frame, text="Save & Refresh", command=save_and_refresh)
@@ -452,12 +839,17 @@ def build_tag_table(frame, config, monitor):
     Each row: serial, name, server_url, api_key, [Delete]
 
     # NEW:
-    - Additional column "Name" that tries to match the serial in monitor.last_items.
+    - Additional column "Name" that tries to match the serial in monitor.last_items_by_serial.
     """
     for child in frame.winfo_children():
         child.destroy()
 
-    # Header
+    build_tag_header(frame)
+    for row in config["tag_configs"]:
+        build_tag_row(frame, row, config, monitor)
+
+def build_tag_header(frame):
+    """Create the header row of the config table; it must be the frame's first child."""
     header = tk.Frame(frame)
     header.pack(fill="x", pady=(0,5))
 
@@ -467,35 +859,45 @@ def build_tag_table(frame, config, monitor):
     tk.Label(header, text="API Key", width=20).pack(side="left", padx=5)
     tk.Label(header, text="Actions", width=8).pack(side="left", padx=5)
 
-    for row in config["tag_configs"]:
-        row_frame = tk.Frame(frame)
-        row_frame.pack(fill="x", pady=2)
-
-        ent_serial = tk.Entry(row_frame, width=15)
-        ent_serial.pack(side="left", padx=5)
-        ent_serial.insert(0, row.get("serial", ""))
-
-        # NEW: We display a label for the Name, by looking at monitor.last_items
-        serial_val = row.get("serial", "")
-        matching_item = next((itm for itm in monitor.last_items if itm.serialNumber == serial_val), None)
-        item_name = matching_item.name if matching_item else "---"
-        lbl_name = tk.Label(row_frame, text=item_name, width=15)
-        lbl_name.pack(side="left", padx=5)
-
-        ent_server = EntryWithPlaceholder("http(s)://waypointdb.domain", row_frame, width=30)
-        ent_server.pack(side="left", padx=5)
-        ent_server.insert(0, row.get("server_url", ""))
-
-        ent_api = tk.Entry(row_frame, width=20)
-        ent_api.pack(side="left", padx=5)
-        ent_api.insert(0, row.get("api_key", ""))
-
-        def delete_this(r=row):
-            config["tag_configs"].remove(r)
-            build_tag_table(frame, config, monitor)
-
-        btn_del = tk.Button(row_frame, text="Delete", command=delete_this)
-        btn_del.pack(side="left", padx=5)
+def build_tag_row(frame, row, config, monitor):
+    """
+    Append a single row of the config table for `row` and return its frame.
+    Deleting it only destroys this row's widgets.
+    """
+    row_frame = tk.Frame(frame)
+    row_frame.pack(fill="x", pady=2)
+
+    ent_serial = tk.Entry(row_frame, width=15)
+    ent_serial.pack(side="left", padx=5)
+    ent_serial.insert(0, row.get("serial", ""))
+
+    # NEW: We display a label for the Name, by looking at monitor.last_items_by_serial
+    serial_val = row.get("serial", "")
+    matching_item = monitor.last_items_by_serial.get(serial_val)
+    item_name = matching_item.name if matching_item else "---"
+    lbl_name = tk.Label(row_frame, text=item_name, width=15)
+    lbl_name.pack(side="left", padx=5)
+
+    ent_server = EntryWithPlaceholder("http(s)://waypointdb.domain", row_frame, width=30)
+    ent_server.pack(side="left", padx=5)
+    ent_server.insert(0, row.get("server_url", ""))
+
+    ent_api = tk.Entry(row_frame, width=20)
+    ent_api.pack(side="left", padx=5)
+    ent_api.insert(0, row.get("api_key", ""))
+
+    def delete_this(r=row, rf=row_frame):
+        config["tag_configs"].remove(r)
+        monitor.reindex_configs()
+        remove_tag_row(rf)
+
+    btn_del = tk.Button(row_frame, text="Delete", command=delete_this)
+    btn_del.pack(side="left", padx=5)
+    return row_frame
+
+def remove_tag_row(row_frame):
+    """Remove a single row of the config table; the other rows are left alone."""
+    row_frame.destroy()
 
 def collect_tag_table_into_config(frame, config):
     """